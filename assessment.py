@@ -1,16 +1,27 @@
 import metric as ms
 import keyboard
+from ngram import NgramTable
 
 # class to run an assessment on a keyboard layout, that is, to supply a keyboard
 # layout a stream of text and track performance metrics
 #   [self.layout] is the layout to be assessed
+#   [self.metric_kwargs] is a dict of metric class -> dict of keyword arguments
+#       used to construct the metric, e.g.
+#       {ms.FingerTravelTracker: {"pitch": 18, "stagger": {2: -0.25}}}
 #   [self.result] is the list of all reports generated by the metrics/trackers
+#   [self.metrics] is the list of metrics/trackers from the last run
+#   [self.ngrams] is the NgramTable of the text from the last run, or None if
+#       it was not collected
 class Assessment():
     # initialze the assessment on a layout which is constructed from grid_spec
-    # and key_placement
-    def __init__(self, grid_spec, key_placement):
+    # and key_placement; metrics missing from [metric_kwargs] are constructed
+    # with their default settings
+    def __init__(self, grid_spec, key_placement, metric_kwargs=None):
         self.layout = keyboard.Layout(grid_spec, key_placement)
+        self.metric_kwargs = {} if metric_kwargs is None else metric_kwargs
         self.result = None
+        self.metrics = None
+        self.ngrams = None
 
     # list of metrics to be run in the assessment
     metrics_classes = [
@@ -19,24 +30,72 @@ class Assessment():
         ms.KeyEaseTracker,
         ms.RepeatFingerTracker,
         ms.AlternationTracker,
+        ms.FingerTravelTracker,
     ]
 
-    # run the assessment on layout, and have each metric be evaluated; will
-    # update [self.result] with the list of reports generated by each metric
-    def run_on(self, filename):
-        metrics = list(map(lambda x: x(), Assessment.metrics_classes))
+    # returns a new instance of each metric in metrics_classes, constructed with
+    # its settings from [self.metric_kwargs] and initialized on the layout
+    def _make_metrics(self):
+        metrics = list(map(
+            lambda x: x(**self.metric_kwargs.get(x, {})),
+            Assessment.metrics_classes))
         for metric in metrics:
             metric.init(self.layout)
 
+        return metrics
+
+    # run the assessment on layout, and have each metric be evaluated; will
+    # update [self.result] with the list of reports generated by each metric.
+    #   [collect_ngrams] if True, the n-gram counts of the text are collected in
+    #       the same pass, so that breakdown() needs no further read of the file
+    def run_on(self, filename, collect_ngrams=False):
+        metrics = self._make_metrics()
+
+        ngrams = NgramTable(self.layout) if collect_ngrams else None
         with open(filename, 'r') as file:
             for line in file:
                 for char in line:
+                    if ngrams is not None:
+                        ngrams.add(char)
                     for metric in metrics:
                         metric.evaluate(char)
 
 
+        self.metrics = metrics
+        self.ngrams = ngrams
         self.result = list(map(lambda x: x.report(), metrics))
 
+    # same as run_on, but the metrics are computed from the unigram and bigram
+    # counts of the text rather than by evaluating each character; the reports
+    # produced are the same
+    def run_fast_on(self, filename):
+        metrics = self._make_metrics()
+
+        ngrams = NgramTable.from_file(self.layout, filename)
+        for metric in metrics:
+            metric.tally(ngrams)
+
+        self.metrics = metrics
+        self.ngrams = ngrams
+        self.result = list(map(lambda x: x.report(), metrics))
+
+    # returns the list of Breakdowns of each count-based metric from the last
+    # run, attributing each total to the keys and bigrams which produced it;
+    # requires the n-gram counts to have been collected during the run
+    def breakdown(self):
+        if self.ngrams is None:
+            raise RuntimeError(
+                "n-gram counts were not collected; run the assessment with "
+                "run_on(filename, collect_ngrams=True) or run_fast_on(filename)")
+
+        breakdowns = map(lambda x: x.breakdown(self.ngrams), self.metrics)
+        return [b for b in breakdowns if b is not None]
+
+    # print the breakdown of each count-based metric from the last run
+    def full_breakdown(self):
+        displayable_result = list(map(lambda x: str(x), self.breakdown()))
+        print("\n".join(displayable_result))
+
     # print a full report of the results from all metrics
     def full_report(self):
         if self.result is None:
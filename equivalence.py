@@ -0,0 +1,216 @@
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+from assessment import Assessment
+import keyboard
+import metric as ms
+
+# differential harness checking that the fast (n-gram) scoring path produces
+# the same reports as the reference (per-character) path. random corpora are
+# run through random placements on keyboard.osl, both paths are timed, and the
+# fast path must be faster. the harness itself is checked by breaking the
+# scoring of the fast path and making sure the trials then fail.
+#
+# usage: python3 equivalence.py [n_trials] [seed]
+#
+# checks raise AssertionError explicitly, so they also run under python -O
+
+# characters which appear in random corpora but have no key on the layout
+untypable = " \n\t\"!-"
+
+# returns a random key placement for keyboard.osl, a permutation of the qwerty
+# keys
+def random_placement(rng):
+    keys = [c for c in keyboard.qwerty if c != ' ']
+    rng.shuffle(keys)
+    return "".join(keys)
+
+# returns a random corpus of [length] characters. characters are drawn with
+# random weights so that some bigrams are much more frequent than others, and
+# include shifted keys and characters which are not on the layout
+def random_corpus(rng, length):
+    keys = [c for c in keyboard.qwerty if c != ' ']
+    shifted = list(keyboard.KeyGrid.unshift_map.keys())
+    alphabet = keys + shifted + list(untypable)
+    weights = [rng.random() ** 3 for _ in alphabet]
+
+    # guarantee at least one typable key, as the ratio metrics are undefined
+    # on an empty text
+    corpus = rng.choices(alphabet, weights=weights, k=length)
+    corpus[rng.randrange(length)] = rng.choice(keys)
+    return "".join(corpus)
+
+# returns random FingerTravelTracker settings, so that the geometry is checked
+# beyond its defaults
+def random_travel_kwargs(rng):
+    stagger = {col: rng.uniform(-0.5, 0.5) for col in range(11) if rng.random() < 0.5}
+    return {"pitch": rng.uniform(15, 20), "stagger": stagger}
+
+# raises an AssertionError with [message] if [condition] does not hold
+def check(condition, message):
+    if not condition:
+        raise AssertionError(message)
+
+# checks that the [reference] and [fast] lists of Reports are the same;
+# integers must match exactly, while floats are allowed to differ by the
+# rounding of a different summation order
+def check_same_reports(reference, fast, context):
+    check(len(reference) == len(fast), context)
+    for ref_report, fast_report in zip(reference, fast):
+        check(ref_report.name == fast_report.name, context)
+        check(ref_report.data.keys() == fast_report.data.keys(), context)
+        for key, ref_value in ref_report.data.items():
+            fast_value = fast_report.data[key]
+            where = f"{context}: {ref_report.name} {key} {ref_value} != {fast_value}"
+            if isinstance(ref_value, float) or isinstance(fast_value, float):
+                check(math.isclose(ref_value, fast_value, rel_tol=1e-9), where)
+            else:
+                check(ref_value == fast_value, where)
+
+# checks that the breakdowns of the [fast] assessment add up to the totals
+# reported by the [reference] assessment: the contributions by key sum to the
+# total, and the contributions by bigram sum to the total less what the metric
+# counts on single keys and on the first key
+def check_breakdowns(reference, fast, context):
+    reported = {}
+    for report in reference.result:
+        reported[report.name] = report.data
+
+    ngrams = fast.ngrams
+    for metric in fast.metrics:
+        breakdown = metric.breakdown(ngrams)
+        if breakdown is None:
+            continue
+
+        total = reported[breakdown.name][breakdown.field]
+        not_bigrams = sum(metric.key_count(key) * n for key, n in ngrams.unigrams.items())
+        not_bigrams = not_bigrams + metric.start_count(ngrams.first_key)
+        sums = [
+            ("total", breakdown.total, total),
+            ("by_key", sum(breakdown.by_key.values()), total),
+            ("by_bigram", sum(breakdown.by_bigram.values()), total - not_bigrams),
+        ]
+        for what, value, expected in sums:
+            check(math.isclose(value, expected, rel_tol=1e-9, abs_tol=1e-9),
+                f"{context}: {breakdown.name} {what} {value} != {expected}")
+
+# returns the finger travel reported for the text in [filename], when the
+# assessment is constructed with the FingerTravelTracker settings [kwargs]
+def travel_with(filename, kwargs):
+    assessment = Assessment(keyboard.osl, keyboard.qwerty,
+        metric_kwargs={ms.FingerTravelTracker: kwargs})
+    assessment.run_on(filename)
+    for report in assessment.result:
+        if report.name == "Finger travel":
+            return report.data["travel"]
+
+# checks that the key pitch and column stagger given to an Assessment reach the
+# FingerTravelTracker
+def check_travel_settings():
+    fd, filename = tempfile.mkstemp()
+    os.close(fd)
+    try:
+        with open(filename, 'w') as file:
+            file.write("the quick brown fox jumps over the lazy dog\n")
+
+        default = travel_with(filename, {})
+        staggered = travel_with(filename, {"stagger": {4: 0.5, 5: 0.5}})
+        check(staggered != default, f"stagger did not change travel ({default})")
+
+        doubled = travel_with(filename, {"pitch": 2 * 19.05})
+        check(math.isclose(doubled, 2 * default),
+            f"doubling pitch gave {doubled}, not 2 * {default}")
+    finally:
+        os.remove(filename)
+
+# runs [n_trials] random trials, and returns the total time spent in the
+# reference and fast paths. the reference path is run_on without n-gram
+# collection, exactly as an assessment is normally run
+def run(n_trials, seed):
+    rng = random.Random(seed)
+    reference_time = 0
+    fast_time = 0
+
+    fd, filename = tempfile.mkstemp()
+    os.close(fd)
+    try:
+        for trial in range(n_trials):
+            placement = random_placement(rng)
+            metric_kwargs = {ms.FingerTravelTracker: random_travel_kwargs(rng)}
+            corpus = random_corpus(rng, rng.randint(1, 20000))
+            with open(filename, 'w') as file:
+                file.write(corpus)
+
+            reference = Assessment(keyboard.osl, placement, metric_kwargs)
+            start = time.perf_counter()
+            reference.run_on(filename)
+            reference_time = reference_time + time.perf_counter() - start
+
+            fast = Assessment(keyboard.osl, placement, metric_kwargs)
+            start = time.perf_counter()
+            fast.run_fast_on(filename)
+            fast_time = fast_time + time.perf_counter() - start
+
+            context = f"trial {trial} (seed {seed}, placement {placement!r})"
+            check_same_reports(reference.result, fast.result, context)
+            check_breakdowns(reference, fast, context)
+    finally:
+        os.remove(filename)
+
+    return reference_time, fast_time
+
+# returns a broken version of a [tally] method, which runs it and then adds
+# one to the metric's [counter]
+def off_by_one(tally, counter):
+    def broken(self, ngrams):
+        tally(self, ngrams)
+        setattr(self, counter, getattr(self, counter) + 1)
+
+    return broken
+
+# methods used only by the fast path, each paired with a broken replacement
+# which the trials must detect
+mutations = [
+    (ms.HandBalanceTracker, "tally", off_by_one(ms.HandBalanceTracker.tally, "n_right")),
+    (ms.HomeRowTracker, "tally", off_by_one(ms.HomeRowTracker.tally, "top")),
+    (ms.KeyEaseTracker, "key_count", lambda self, key: 1),
+    (ms.RepeatFingerTracker, "bigram_count", lambda self, prev_key, key: 0),
+    (ms.AlternationTracker, "bigram_count", lambda self, prev_key, key: 1),
+    (ms.FingerTravelTracker, "bigram_count", lambda self, prev_key, key: 1.0),
+    (ms.FingerTravelTracker, "start_count", lambda self, key: 1000.0),
+]
+
+# checks that each of the mutations makes the trials fail, i.e. that the
+# harness compares two independent computations rather than one with itself
+def check_detects_mutations(seed):
+    for cls, name, broken in mutations:
+        original = cls.__dict__[name]
+        setattr(cls, name, broken)
+        try:
+            run(3, seed)
+        except AssertionError:
+            continue
+        finally:
+            setattr(cls, name, original)
+
+        raise AssertionError(f"broken {cls.__name__}.{name} went undetected")
+
+if __name__ == "__main__":
+    n_trials = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+
+    check_travel_settings()
+    check_detects_mutations(seed)
+    reference_time, fast_time = run(n_trials, seed)
+    check(fast_time < reference_time,
+        f"fast path ({fast_time:.3f}s) is not faster than reference ({reference_time:.3f}s)")
+
+    print(f"{n_trials} trials passed")
+    print(f"reference: {reference_time:.3f}s")
+    print(f"fast:      {fast_time:.3f}s")
+    if fast_time > 0:
+        print(f"speedup:   {reference_time / fast_time:.1f}x")
@@ -1,3 +1,5 @@
+import math
+
 from keyboard import KeyGrid 
 
 # class wrapping the output of each metric/tracker
@@ -20,6 +22,42 @@ class Report():
 
         return s
 
+# class wrapping the attribution of a count-based metric's total to the keys
+# and bigrams which produced it. only non-zero entries are kept.
+#   [self.name] is the name of the metric tracked
+#   [self.field] is the field of the metric's Report which is broken down
+#   [self.by_key] is a dict of key -> contribution to the total; contributions
+#       of a bigram are attributed to its second key
+#   [self.by_bigram] is a dict of (prev_key, key) -> contribution to the total
+#   [self.total] is the total as reported by the metric, equal to the sum of
+#       self.by_key
+# for metrics where shift makes no difference, shifted keys are folded onto
+# their unshifted counterpart, so that each entry is a physical key (or pair of
+# physical keys)
+class Breakdown():
+    def __init__(self, name, field, total, by_key, by_bigram):
+        self.name = name
+        self.field = field
+        self.total = total
+        self.by_key = by_key
+        self.by_bigram = by_bigram
+
+    # returns the [n] largest entries of [counts] as a list of (item, value)
+    # pairs, largest first
+    @staticmethod
+    def top(counts, n=10):
+        return sorted(counts.items(), key=lambda x: x[1], reverse=True)[:n]
+
+    # returns a fancy string containing the largest contributors to the total
+    def __str__(self):
+        s = f"| {self.name} \n|    {self.field}: {self.total}"
+        for key, val in Breakdown.top(self.by_key):
+            s = s + f"\n|     {key}:\t {val}"
+        for (prev_key, key), val in Breakdown.top(self.by_bigram):
+            s = s + f"\n|     {prev_key}{key}:\t {val}"
+
+        return s
+
 # abstract class representing a keyboard property that can be measured/tracked
 #   [self.layout] is the Layout which is tracked
 #   [self.key_ease_grid] is the KeyGrid which represents how easy each key
@@ -64,6 +102,19 @@ class Metric():
         "R_index": 4
     }
 
+    # maps each finger to the (row, col) position it rests on
+    finger_home_map = {
+        "L_pinky": (1, 0),
+        "L_ring": (1, 1),
+        "L_middle": (1, 2),
+        "L_index": (1, 3),
+
+        "R_index": (1, 6),
+        "R_middle": (1, 7),
+        "R_ring": (1, 8),
+        "R_pinky": (1, 9)
+    }
+
     # defines the row id of the home row
     home_row = 1
     
@@ -82,7 +133,7 @@ class Metric():
     # return integer distance between a [key] and the home_row
     def home_row_distance(self, key):
         row, col = self.layout.grid[key]
-        return abs(row - home_row)
+        return abs(row - Metric.home_row)
 
     # returns the ease of pressing [key]
     def key_ease(self, key):
@@ -132,7 +183,88 @@ class Metric():
         return 
 
     def when_space(self, key):
-        return 
+        return
+
+    # count-based metrics define how much a single typable [key] adds to their
+    # total; defaults to nothing
+    def key_count(self, key):
+        return 0
+
+    # count-based metrics define how much a pair of consecutive typable keys
+    # [prev_key], [key] adds to their total; defaults to nothing
+    def bigram_count(self, prev_key, key):
+        return 0
+
+    # count-based metrics define how much the first typable [key] of the text
+    # adds to their total, on top of its key_count; defaults to nothing
+    def start_count(self, key):
+        return 0
+
+    # sets the state of the metric directly from the n-gram counts of a text,
+    # as if evaluate() had been called on each of its keys. every metric in
+    # Assessment.metrics_classes must define it to be run by run_fast_on
+    #   [ngrams] is the NgramTable of the text
+    def tally(self, ngrams):
+        raise NotImplementedError(
+            f"{type(self).__name__} does not define tally(), so it cannot be "
+            "computed from n-gram counts")
+
+    # helper for count-based metrics which computes their total directly from
+    # the n-gram counts, in one pass over each table
+    def _total(self, ngrams):
+        total = 0
+        for key, n in ngrams.unigrams.items():
+            total = total + self.key_count(key) * n
+
+        for (prev_key, key), n in ngrams.bigrams.items():
+            total = total + self.bigram_count(prev_key, key) * n
+
+        if ngrams.first_key is not None:
+            total = total + self.start_count(ngrams.first_key)
+
+        return total
+
+    # returns a Breakdown of the metric's total, or None if the metric is not
+    # count-based
+    #   [ngrams] is the NgramTable of the text the metric was run on
+    def breakdown(self, ngrams):
+        return None
+
+    # helper for count-based metrics which computes the Breakdown of their
+    # total directly from the n-gram counts, in one pass over each table
+    #   [name] is the name of the metric
+    #   [field] is the field of the metric's Report which is broken down
+    #   [ngrams] is the NgramTable of the text the metric was run on
+    #   [fold_shift] if True, shifted keys are folded onto their unshifted
+    #       counterpart; metrics which tell them apart must pass False
+    def _breakdown(self, name, field, ngrams, fold_shift=True):
+        if fold_shift:
+            unshift = lambda x: KeyGrid.unshift_map.get(x, x)
+        else:
+            unshift = lambda x: x
+        by_key = {}
+        by_bigram = {}
+
+        for key, n in ngrams.unigrams.items():
+            count = self.key_count(key) * n
+            if count != 0:
+                by_key[unshift(key)] = by_key.get(unshift(key), 0) + count
+
+        for (prev_key, key), n in ngrams.bigrams.items():
+            count = self.bigram_count(prev_key, key) * n
+            if count != 0:
+                bigram = (unshift(prev_key), unshift(key))
+                by_bigram[bigram] = by_bigram.get(bigram, 0) + count
+                by_key[unshift(key)] = by_key.get(unshift(key), 0) + count
+
+        if ngrams.first_key is not None:
+            key = ngrams.first_key
+            count = self.start_count(key)
+            if count != 0:
+                by_key[unshift(key)] = by_key.get(unshift(key), 0) + count
+
+        total = self.report().data[field]
+        return Breakdown(name, field, total, by_key, by_bigram)
 
 # a subcategory of Metric which utilize a queue in tracking.
 #   [self.queue] is the queue 
@@ -177,6 +309,18 @@ class HandBalanceTracker(Metric):
     
     def when_false(self, key):
         self.n_left = self.n_left + 1
+
+    def tally(self, ngrams):
+        n_left = 0
+        n_right = 0
+        for key, n in ngrams.unigrams.items():
+            if self.condition(key):
+                n_right = n_right + n
+            else:
+                n_left = n_left + n
+
+        self.n_left = n_left
+        self.n_right = n_right
         
     def report(self):
         report = Report(
@@ -205,6 +349,23 @@ class HomeRowTracker(Metric):
         elif row == 2:
             self.bottom = self.bottom + 1
 
+    def tally(self, ngrams):
+        top = 0
+        home = 0
+        bottom = 0
+        for key, n in ngrams.unigrams.items():
+            row, col = self.layout.grid[key]
+            if row == 0:
+                top = top + n
+            elif row == 1:
+                home = home + n
+            elif row == 2:
+                bottom = bottom + n
+
+        self.top = top
+        self.home = home
+        self.bottom = bottom
+
     def report(self):
         report = Report(
             name="Row percentage",
@@ -228,6 +389,15 @@ class KeyEaseTracker(Metric):
         key_ease = self.key_ease_grid[row, col]
         self.cumulative_ease = self.cumulative_ease + int(key_ease)
 
+    def key_count(self, key):
+        return int(self.key_ease(key))
+
+    def tally(self, ngrams):
+        self.cumulative_ease = self._total(ngrams)
+
+    def breakdown(self, ngrams):
+        return self._breakdown("Cumulative Key Ease", "score", ngrams)
+
     def report(self):
         report = Report(
             name="Cumulative Key Ease",
@@ -261,6 +431,19 @@ class RepeatFingerTracker(QueueTracker):
     def when_false(self, key):
         self.enqueue(key)
 
+    def bigram_count(self, prev_key, key):
+        if key == prev_key:
+            return 0
+        return 1 if self.same_finger(key, prev_key) else 0
+
+    def tally(self, ngrams):
+        self.repeats = self._total(ngrams)
+
+    def breakdown(self, ngrams):
+        # 'a' followed by 'A' is a repeat, so shifted keys are kept apart
+        return self._breakdown("Repeated Fingers", "repeats", ngrams,
+            fold_shift=False)
+
     def report(self):
         report = Report(
             name="Repeated Fingers",
@@ -291,6 +474,15 @@ class AlternationTracker(QueueTracker):
     def when_false(self, key):
         self.enqueue(key)
 
+    def bigram_count(self, prev_key, key):
+        return 1 if self.hand(prev_key) != self.hand(key) else 0
+
+    def tally(self, ngrams):
+        self.hand_switches = self._total(ngrams)
+
+    def breakdown(self, ngrams):
+        return self._breakdown("Hand alternations", "switches", ngrams)
+
     def report(self):
         report = Report(
             name="Hand alternations",
@@ -302,6 +494,122 @@ class AlternationTracker(QueueTracker):
 
         return report
 
+# tracks the total physical distance travelled by the fingers, using the real
+# key coordinates of the layout. a finger moves from its home position to each
+# key it presses, and stays there while it presses the following key; once
+# another finger is used, it returns to its home position.
+#   [self.pitch] is the distance between the centers of adjacent keys
+#   [self.stagger] is a dict of col -> vertical offset of the column, in keys
+#       (e.g. 0.25 moves the column down by a quarter key); columns which are
+#       missing are not offset
+#   [self.finger_distances] is a dict of finger -> dict of (pos1, pos2) ->
+#       distance between the two positions, over the positions typed by the
+#       finger including its home position
+#   [self.travel_map] is a dict of (pos1, pos2) -> distance travelled when the
+#       key at pos2 follows the key at pos1
+#   [self.travel] is the total distance travelled
+class FingerTravelTracker(QueueTracker):
+    def __init__(self, pitch=19.05, stagger=None):
+        super().__init__(max_window=1)
+        self.pitch = pitch
+        self.stagger = {} if stagger is None else stagger
+        self.finger_distances = {}
+        self.travel_map = {}
+        self.travel = 0
+
+    # precompute the distances between all positions of the layout once, so
+    # that the bigram-weighted sum in tally() only needs lookups. when_true()
+    # deliberately recomputes each move from the key coordinates instead, so
+    # that it stays an independent reference for the n-gram path
+    def init(self, layout):
+        super().init(layout)
+
+        positions = layout.grid.ordered_positions()
+        finger_positions = {}
+        for finger, home in Metric.finger_home_map.items():
+            finger_positions[finger] = [home]
+        for pos in positions:
+            finger = Metric.col_finger_map[pos[1]]
+            if pos not in finger_positions[finger]:
+                finger_positions[finger].append(pos)
+
+        for finger, finger_pos in finger_positions.items():
+            self.finger_distances[finger] = {
+                (pos1, pos2): self.distance(pos1, pos2)
+                for pos1 in finger_pos for pos2 in finger_pos
+            }
+
+        for pos1 in positions:
+            finger1 = Metric.col_finger_map[pos1[1]]
+            home1 = Metric.finger_home_map[finger1]
+            for pos2 in positions:
+                finger2 = Metric.col_finger_map[pos2[1]]
+                home2 = Metric.finger_home_map[finger2]
+                if finger1 == finger2:
+                    travel = self.finger_distances[finger1][(pos1, pos2)]
+                else:
+                    travel = (self.finger_distances[finger1][(pos1, home1)]
+                        + self.finger_distances[finger2][(home2, pos2)])
+                self.travel_map[(pos1, pos2)] = travel
+
+    # returns the physical (x, y) coordinates of the center of the key at [pos]
+    def coordinates(self, pos):
+        row, col = pos
+        x = col * self.pitch
+        y = (row + self.stagger.get(col, 0)) * self.pitch
+        return (x, y)
+
+    # returns the straight line distance between the positions [pos1], [pos2]
+    def distance(self, pos1, pos2):
+        x1, y1 = self.coordinates(pos1)
+        x2, y2 = self.coordinates(pos2)
+        return math.hypot(x2 - x1, y2 - y1)
+
+    # the finger pressing [key] moves to it from the previous key if it pressed
+    # that key too, and from its home position otherwise, in which case the
+    # finger of the previous key returns to its own home position
+    def when_true(self, key):
+        pos = self.layout.grid[key]
+        home = Metric.finger_home_map[self.finger(key)]
+
+        if len(self.queue) > 0:
+            prev_key = self.queue[-1]
+            prev_pos = self.layout.grid[prev_key]
+            if self.same_finger(prev_key, key):
+                self.travel = self.travel + self.distance(prev_pos, pos)
+            else:
+                prev_home = Metric.finger_home_map[self.finger(prev_key)]
+                self.travel = self.travel + self.distance(prev_pos, prev_home)
+                self.travel = self.travel + self.distance(home, pos)
+        else:
+            self.travel = self.travel + self.distance(home, pos)
+        self.enqueue(key)
+
+    def start_count(self, key):
+        pos = self.layout.grid[key]
+        home = Metric.finger_home_map[self.finger(key)]
+        return self.finger_distances[self.finger(key)][(home, pos)]
+
+    def bigram_count(self, prev_key, key):
+        return self.travel_map[(self.layout.grid[prev_key], self.layout.grid[key])]
+
+    def tally(self, ngrams):
+        self.travel = self._total(ngrams)
+
+    def breakdown(self, ngrams):
+        return self._breakdown("Finger travel", "travel", ngrams)
+
+    def report(self):
+        report = Report(
+            name="Finger travel",
+            description="Total distance travelled by the fingers between keys, returning home when another finger is used",
+            data_dict={
+                "travel": self.travel
+            }
+        )
+
+        return report
+
 # TODO: implement
 # class InsideRollTracker(QueueTracker):
 #     def __init__(self):
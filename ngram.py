@@ -0,0 +1,48 @@
+# class holding the unigram and bigram counts of a text stream, as seen by a
+# layout. characters which have no position on the layout (spaces, newlines,
+# unknown symbols) are dropped, so that a bigram is a pair of consecutive
+# typable keys, which is exactly the pair a QueueTracker compares when run
+# over the same text. keys are stored as they appear in the text (shifted keys
+# are not folded onto their unshifted counterpart), since some metrics tell
+# them apart.
+#   [self.layout] is the Layout used to decide which keys are typable
+#   [self.unigrams] is a dict of key -> number of occurrences
+#   [self.bigrams] is a dict of (prev_key, key) -> number of occurrences
+#   [self.first_key] is the first typable key added, or None
+#   [self.prev_key] is the last typable key added, or None
+class NgramTable():
+    def __init__(self, layout):
+        self.layout = layout
+        self.unigrams = {}
+        self.bigrams = {}
+        self.first_key = None
+        self.prev_key = None
+
+    # count a single [key] of the text stream
+    def add(self, key):
+        if key == ' ' or self.layout.grid[key] is None:
+            return
+
+        self.unigrams[key] = self.unigrams.get(key, 0) + 1
+        if self.prev_key is not None:
+            bigram = (self.prev_key, key)
+            self.bigrams[bigram] = self.bigrams.get(bigram, 0) + 1
+        else:
+            self.first_key = key
+
+        self.prev_key = key
+
+    # count every key of a [text] string
+    def add_text(self, text):
+        for char in text:
+            self.add(char)
+
+    # returns a new NgramTable holding the counts of the file [filename]
+    @staticmethod
+    def from_file(layout, filename):
+        table = NgramTable(layout)
+        with open(filename, 'r') as file:
+            for line in file:
+                table.add_text(line)
+
+        return table